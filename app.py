@@ -16,10 +16,20 @@ def parse_ris_file(file_path):
                 data['title'] = line[6:]
             elif any(line.startswith(f"{key}  - ") for key in abstract_keys) and 'abstract' not in data:
                 data['abstract'] = line[6:]
+            elif line.startswith("DO  - "):
+                data['doi'] = line[6:]
     if 'title' not in data: data['title'] = ''
     if 'abstract' not in data: data['abstract'] = ''
     return [data]
 
+def extract_doi(entry):
+    # Los .bib de arXiv no traen 'doi' pero sí 'eprint'; el corpus usa el DOI 10.48550/arXiv.<id>
+    if entry.get('doi'):
+        return entry['doi']
+    if entry.get('eprint') and entry.get('archiveprefix', '').lower() == 'arxiv':
+        return f"10.48550/arXiv.{entry['eprint']}"
+    return None
+
 class SimilarityApp:
     def __init__(self, root):
         self.root = root
@@ -48,6 +58,10 @@ class SimilarityApp:
         self.vector_var = tk.StringVar(value="tfidf")
         self.vector_combo = ttk.Combobox(options_frame, textvariable=self.vector_var, values=["freq", "binary", "tfidf"], state="readonly")
         self.vector_combo.grid(row=1, column=3, padx=5, pady=5, sticky="ew")
+        ttk.Label(options_frame, text="Modo:").grid(row=2, column=0, padx=5, pady=5, sticky="w")
+        self.mode_var = tk.StringVar(value="vocabulary")
+        self.mode_combo = ttk.Combobox(options_frame, textvariable=self.mode_var, values=["vocabulary", "hashing"], state="readonly")
+        self.mode_combo.grid(row=2, column=1, padx=5, pady=5, sticky="ew")
         options_frame.columnconfigure(1, weight=1)
         options_frame.columnconfigure(3, weight=1)
         file_frame = ttk.LabelFrame(main_frame, text="Documento de Entrada", padding="10")
@@ -126,9 +140,11 @@ class SimilarityApp:
         corpus = self.corpus_var.get()
         feature = self.feature_var.get()
         vector = self.vector_var.get()
+        mode = self.mode_var.get()
         
         # Enviamos el texto combinado a la función de similitud
-        results = find_similar_documents(combined_query_text, corpus, feature, vector)
+        # Si el artículo ya está en el corpus (por DOI), se usa el grafo de vecinos precalculado
+        results = find_similar_documents(combined_query_text, corpus, feature, vector, mode=mode, doi=extract_doi(self.bib_data))
 
         display_text = "No se encontraron resultados o ocurrió un error.\nRevisa la consola para más detalles."
         if results:
@@ -1,13 +1,15 @@
-import polars as pl
-import pandas as pd
-from scrapers import arxiv_scraper, pubmed_scraper
-from normalization import text_normalizer
+# Los scrapers, polars/pandas y el normalizador (que carga spaCy al importarse) se importan
+# dentro de cada función: así pipeline.py puede revisar qué etapas están al día sin cargarlos,
+# y un proceso que solo normaliza no importa los scrapers.
 
 # ***********************************************************************
 #                     --- 1. RECOLECCIÓN DE LOS ARTÍCULOS ---
 # ***********************************************************************
-def build_arxiv_corpus():
+def build_arxiv_corpus(output_file: str = "raw_corpus/arxiv_raw_corpus.csv"):
     """Recolecta datos de todas las secciones de arXiv y crea el corpus CSV."""
+    import polars as pl
+    from scrapers import arxiv_scraper
+
     all_arxiv_articles = []
     
     # Recolectar 100 artículos de cada sección 
@@ -17,7 +19,7 @@ def build_arxiv_corpus():
 
     if not all_arxiv_articles:
         print("No se recolectaron artículos de arXiv. Abortando la creación del corpus.")
-        return
+        return False
 
     # Crear DataFrame con Polars
     df = pl.DataFrame(all_arxiv_articles)
@@ -26,18 +28,21 @@ def build_arxiv_corpus():
     df = df.select(["DOI", "Title", "Authors", "Abstract", "Section", "Date"])
     
     # Guardar en CSV con separador de tabulación [cite: 67]
-    output_file = "arxiv_raw_corpus.csv"
     df.write_csv(output_file, separator='\t')
     print(f"Corpus de arXiv guardado exitosamente en '{output_file}' con {len(df)} artículos.")
+    return True
 
-def build_pubmed_corpus():
+def build_pubmed_corpus(output_file: str = "raw_corpus/pubmed_raw_corpus.csv"):
     """Recolecta datos de PubMed y crea el corpus CSV."""
+    import polars as pl
+    from scrapers import pubmed_scraper
+
     # Recolectar 300 artículos 
     all_pubmed_articles = pubmed_scraper.scrape_pubmed(num_articles=300)
 
     if not all_pubmed_articles:
         print("No se recolectaron artículos de PubMed. Abortando la creación del corpus.")
-        return
+        return False
 
     df = pl.DataFrame(all_pubmed_articles)
     
@@ -45,24 +50,28 @@ def build_pubmed_corpus():
     df = df.select(["DOI", "Title", "Authors", "Abstract", "Journal", "Date"])
 
     # Guardar en CSV con separador de tabulación [cite: 77]
-    output_file = "pubmed_raw_corpus.csv"
     df.write_csv(output_file, separator='\t')
     print(f"Corpus de PubMed guardado exitosamente en '{output_file}' con {len(df)} artículos.")
+    return True
 
 # ***********************************************************************
 #              --- 2. NORMALIZACIÓN DE CADA CORPUS DE TEXTO ---
 # ***********************************************************************
-def build_corpus_normalization():
-    """ Normaliza el corpus crudo de ArXiv y PubMed """
-    
-    # 1. Cargar el corpus crudo de arXiv
-    print("Cargando el corpus crudo...")
-    input_csv_path = 'arxiv_raw_corpus.csv'
+def normalize_corpus(corpus_name: str, input_csv_path: str | None = None, output_csv_path: str | None = None):
+    """ Normaliza el Título y el Abstract del corpus crudo indicado ('arxiv' o 'pubmed') """
+    import pandas as pd
+    from normalization import text_normalizer
+
+    input_csv_path = input_csv_path or f'raw_corpus/{corpus_name}_raw_corpus.csv'
+    output_csv_path = output_csv_path or f'normalizated_corpus/{corpus_name}_normalized_corpus.csv'
+
+    # 1. Cargar el corpus crudo
+    print(f"Cargando el corpus crudo de {corpus_name}...")
     try:
         df = pd.read_csv(input_csv_path, sep='\t')
     except FileNotFoundError:
         print(f"Error: No se encontró el archivo '{input_csv_path}'. Asegúrate de que esté en la misma carpeta.")
-        return
+        return False
 
     # Crear una copia para la normalización
     normalized_df = df.copy()
@@ -75,11 +84,19 @@ def build_corpus_normalization():
     normalized_df['Abstract'] = df['Abstract'].astype(str).apply(text_normalizer.normalize_text)
 
     # 3. Guardar el corpus normalizado
-    output_csv_path = 'arxiv_normalized_corpus.csv'
     print(f"Guardando el corpus normalizado en '{output_csv_path}'...")
     normalized_df.to_csv(output_csv_path, index=False, encoding='utf-8')
 
     print("¡Proceso completado con éxito!")
+    return True
+
+
+def build_corpus_normalization():
+    """ Normaliza el corpus crudo de ArXiv y PubMed """
+    from normalization import text_normalizer
+
+    for corpus_name in ("arxiv", "pubmed"):
+        normalize_corpus(corpus_name)
 
     # Ejemplo de uso con una consulta (esto también estaría en tu script principal)
     user_query = "I am looking for articles about Large Language Models and their challenges in NLP"
@@ -90,9 +107,9 @@ def build_corpus_normalization():
 
     
 if __name__ == "__main__":
-    print("Iniciando el proceso de recolección de artículos...")
-    
-    # Puedes elegir cuál construir o construir ambos
-    #build_arxiv_corpus()
-    #build_pubmed_corpus() # Descomentar cuando el scraper de PubMed esté listo
-    # build_corpus_normalization()
\ No newline at end of file
+    # Recolección, normalización y representación se orquestan desde pipeline.py,
+    # que solo vuelve a ejecutar las etapas cuyas entradas o código cambiaron.
+    # Ejemplos: python pipeline.py --scrape   |   python pipeline.py --corpus arxiv --force
+    # (python main.py acepta las mismas opciones y solo las reenvía a pipeline.main).
+    import pipeline
+    pipeline.main()
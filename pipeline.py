@@ -0,0 +1,449 @@
+# pipeline.py
+#
+# Orquestador incremental: recolección -> normalización -> representación por corpus.
+# Cada etapa tiene una huella (hash del contenido de sus entradas, de su código y de
+# sus argumentos); si la huella no cambió y sus salidas existen, la etapa se omite.
+# Las etapas independientes (ambos corpus, ambos modos, las 6 representaciones) corren en paralelo.
+#
+# Los módulos pesados (spaCy, pandas, sklearn, polars) solo se importan dentro de las
+# tareas, así una reconstrucción sin cambios no los carga.
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from representation.paths import (DEFAULT_HASH_FEATURES, FEATURE_TYPES, REPRESENTATION_MODES, VECTOR_TYPES,
+                                  build_id_file, doi_index_file, representation_files)
+
+CORPORA = ('arxiv', 'pubmed')
+STATE_FILE = '.pipeline_state.json'
+
+# Archivos cuyo contenido define la "versión de código" de cada tipo de etapa.
+STAGE_CODE = {
+    'scrape_arxiv': ['main.py', 'scrapers/arxiv_scraper.py'],
+    'scrape_pubmed': ['main.py', 'scrapers/pubmed_scraper.py'],
+    'normalize': ['main.py', 'normalization/text_normalizer.py'],
+    'vectorize': ['representation/text_representation.py', 'representation/paths.py', 'representation/knn_graph.py'],
+    'publish': ['representation/text_representation.py', 'representation/paths.py',
+                'representation/knn_graph.py', 'query_cache.py'],
+}
+
+
+def raw_corpus_path(corpus_name: str) -> str:
+    return f'raw_corpus/{corpus_name}_raw_corpus.csv'
+
+
+def normalized_corpus_path(corpus_name: str) -> str:
+    return f'normalizated_corpus/{corpus_name}_normalized_corpus.csv'
+
+
+# --- TAREAS (se ejecutan en los procesos del pool) ---
+
+def _task_scrape(corpus_name: str) -> bool:
+    import main
+    if corpus_name == 'arxiv':
+        return main.build_arxiv_corpus(raw_corpus_path(corpus_name))
+    return main.build_pubmed_corpus(raw_corpus_path(corpus_name))
+
+
+def _task_normalize(corpus_name: str) -> bool:
+    import main
+    return main.normalize_corpus(corpus_name, raw_corpus_path(corpus_name), normalized_corpus_path(corpus_name))
+
+
+def _task_vectorize(corpus_name: str, vector_type: str, feature_type: str, mode: str,
+                    n_features: int = DEFAULT_HASH_FEATURES, alternate_sign: bool = True) -> bool:
+    from representation.text_representation import build_single_representation
+    return build_single_representation(corpus_name, vector_type, feature_type, mode, n_features, alternate_sign)
+
+
+def _task_publish(corpus_name: str, mode: str) -> bool:
+    from representation.text_representation import publish_representations
+    return publish_representations(corpus_name, mode)
+
+
+def _run_timed(func, args):
+    start = time.perf_counter()
+    ok = func(*args)
+    return bool(ok), time.perf_counter() - start
+
+
+# --- DEFINICIÓN DEL DAG ---
+
+class Stage:
+    def __init__(self, name, func, args, inputs, outputs, code, deps=()):
+        self.name = name
+        self.func = func
+        self.args = tuple(args)
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.code = list(code)
+        self.deps = list(deps)
+
+
+def build_stages(corpora=CORPORA, modes=('vocabulary',), scrape: bool = False,
+                 n_features: int = DEFAULT_HASH_FEATURES, alternate_sign: bool = True) -> dict:
+    """
+    Construye {nombre: Stage} con el DAG scrape -> normalize -> vectorize (x6) -> publish
+    para cada corpus y modo. Sin 'scrape', el CSV crudo se trata como entrada fija.
+    Las etapas vectorize escriben en 'staging'; publish, solo si las 6 terminaron, reemplaza
+    uno por uno los archivos publicados y el índice DOI entre dos escrituras del build id
+    (ver publish_representations).
+    """
+    stages = {}
+    for corpus_name in corpora:
+        raw_csv = raw_corpus_path(corpus_name)
+        normalized_csv = normalized_corpus_path(corpus_name)
+
+        normalize_deps = []
+        if scrape:
+            stages[f'scrape_{corpus_name}'] = Stage(
+                f'scrape_{corpus_name}', _task_scrape, [corpus_name],
+                inputs=[], outputs=[raw_csv], code=STAGE_CODE[f'scrape_{corpus_name}'])
+            normalize_deps = [f'scrape_{corpus_name}']
+
+        stages[f'normalize_{corpus_name}'] = Stage(
+            f'normalize_{corpus_name}', _task_normalize, [corpus_name],
+            inputs=[raw_csv], outputs=[normalized_csv], code=STAGE_CODE['normalize'], deps=normalize_deps)
+
+        for mode in modes:
+            # Los parámetros del hashing forman parte de la huella: si cambian, la etapa queda vencida.
+            mode_args = [n_features, alternate_sign] if mode == 'hashing' else []
+
+            vector_stage_names = []
+            staged_inputs = []
+            published_outputs = []
+            for vector_type in VECTOR_TYPES:
+                for feature_type in FEATURE_TYPES:
+                    name = f'vectorize_{corpus_name}_{vector_type}_{feature_type}_{mode}'
+                    staged = representation_files(corpus_name, vector_type, feature_type, mode, staging=True)
+                    stages[name] = Stage(
+                        name, _task_vectorize, [corpus_name, vector_type, feature_type, mode] + mode_args,
+                        inputs=[normalized_csv], outputs=staged, code=STAGE_CODE['vectorize'],
+                        deps=[f'normalize_{corpus_name}'])
+                    vector_stage_names.append(name)
+                    # El .npz se deriva de la matriz; basta con la matriz y el vectorizador.
+                    staged_inputs.extend(staged[:2])
+                    published_outputs.extend(representation_files(corpus_name, vector_type, feature_type, mode))
+
+            # El build id solo cambia si cambió el contenido de alguna representación,
+            # así el caché de consultas sobrevive a una reconstrucción sin cambios.
+            stages[f'publish_{corpus_name}_{mode}'] = Stage(
+                f'publish_{corpus_name}_{mode}', _task_publish, [corpus_name, mode],
+                inputs=[normalized_csv] + staged_inputs,
+                outputs=published_outputs + [doi_index_file(corpus_name, mode), build_id_file(corpus_name, mode)],
+                code=STAGE_CODE['publish'], deps=vector_stage_names)
+    return stages
+
+
+# --- HUELLAS ---
+
+class Fingerprinter:
+    """
+    Calcula hashes de contenido. Reutiliza el hash guardado de un archivo si su tamaño
+    y fecha de modificación no cambiaron, para no releer los .pkl en cada ejecución.
+    """
+
+    def __init__(self, file_cache: dict):
+        self.file_cache = file_cache
+
+    def file_hash(self, path: str) -> str | None:
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return None
+        cached = self.file_cache.get(path)
+        if cached and cached['size'] == st.st_size and cached['mtime_ns'] == st.st_mtime_ns:
+            return cached['sha256']
+
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+        sha = digest.hexdigest()
+        self.file_cache[path] = {'size': st.st_size, 'mtime_ns': st.st_mtime_ns, 'sha256': sha}
+        return sha
+
+    def stage_fingerprint(self, stage: Stage) -> str:
+        payload = {
+            'args': list(stage.args),
+            'code': {path: self.file_hash(path) for path in stage.code},
+            'inputs': {path: self.file_hash(path) for path in stage.inputs},
+        }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def load_state(path: str = STATE_FILE) -> dict:
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        state = {}
+    state.setdefault('stages', {})
+    state.setdefault('files', {})
+    return state
+
+
+def save_state(state: dict, path: str = STATE_FILE):
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+# --- EJECUCIÓN ---
+
+class _LazyExecutor:
+    """ProcessPoolExecutor que no arranca procesos hasta el primer submit."""
+
+    def __init__(self, workers):
+        self.workers = workers
+        self._executor = None
+
+    def submit(self, func, *args):
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        return self._executor.submit(func, *args)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+
+
+def run_pipeline(stages: dict, workers: int | None = None, force: bool = False, state_path: str = STATE_FILE) -> list:
+    """
+    Ejecuta el DAG. Una etapa se evalúa cuando todas sus dependencias terminaron; si su
+    huella coincide con la guardada y sus salidas existen, se omite.
+    Devuelve una lista de (etapa, estado, segundos) en orden de finalización.
+    """
+    state = load_state(state_path)
+    fingerprinter = Fingerprinter(state['files'])
+    status = {}          # nombre -> 'skipped' | 'ran' | 'failed' | 'blocked'
+    report = []
+    pending = set(stages)
+    running = {}         # future -> (nombre, huella)
+
+    def schedule_ready(executor):
+        progressed = True
+        while progressed:
+            progressed = False
+            for name in sorted(pending):
+                stage = stages[name]
+                if any(dep in pending or dep not in status for dep in stage.deps if dep in stages):
+                    continue
+                pending.discard(name)
+                progressed = True
+
+                if any(status.get(dep) in ('failed', 'blocked') for dep in stage.deps):
+                    status[name] = 'blocked'
+                    report.append((name, 'blocked', 0.0))
+                    continue
+
+                missing_inputs = [path for path in stage.inputs if not os.path.exists(path)]
+                if missing_inputs:
+                    print(f"Error: faltan entradas para '{name}': {missing_inputs}")
+                    status[name] = 'failed'
+                    report.append((name, 'failed', 0.0))
+                    continue
+
+                fingerprint = fingerprinter.stage_fingerprint(stage)
+                fresh = (state['stages'].get(name) == fingerprint
+                         and all(os.path.exists(path) for path in stage.outputs))
+                if fresh and not force:
+                    status[name] = 'skipped'
+                    report.append((name, 'skipped', 0.0))
+                    continue
+
+                future = executor.submit(_run_timed, stage.func, stage.args)
+                running[future] = (name, fingerprint)
+
+    # El pool se crea solo si alguna etapa necesita ejecutarse.
+    executor = _LazyExecutor(workers)
+    try:
+        schedule_ready(executor)
+        while running:
+            done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+            for future in done:
+                name, fingerprint = running.pop(future)
+                try:
+                    ok, elapsed = future.result()
+                except Exception as e:
+                    print(f"Error en la etapa '{name}': {e}")
+                    ok, elapsed = False, 0.0
+
+                ok = ok and all(os.path.exists(path) for path in stages[name].outputs)
+                status[name] = 'ran' if ok else 'failed'
+                report.append((name, status[name], elapsed))
+                if ok:
+                    state['stages'][name] = fingerprint
+                else:
+                    state['stages'].pop(name, None)
+                save_state(state, state_path)
+            schedule_ready(executor)
+    finally:
+        executor.shutdown()
+
+    save_state(state, state_path)
+    return report
+
+
+def print_report(report: list, total_seconds: float):
+    print(f"\n{'Etapa':<45} | {'Estado':<8} | {'Tiempo (s)':>10}")
+    print("=" * 70)
+    for name, stage_status, elapsed in report:
+        print(f"{name:<45} | {stage_status:<8} | {elapsed:>10.3f}")
+    print("=" * 70)
+    print(f"{'Total (reloj)':<45} | {'':<8} | {total_seconds:>10.3f}")
+
+
+# --- VERIFICACIÓN (python pipeline.py --self-check) ---
+# Tareas triviales sobre archivos de texto, a nivel de módulo para que el pool pueda enviarlas.
+
+def _check_task_normalize(src: str, dst: str) -> bool:
+    with open(src, encoding='utf-8') as f:
+        text = f.read()
+    with open(dst, 'w', encoding='utf-8') as f:
+        f.write(text.lower())
+    return True
+
+
+def _check_task_vectorize(src: str, dst: str) -> bool:
+    with open(src, encoding='utf-8') as f:
+        text = f.read()
+    if 'falla' in text:
+        return False
+    with open(dst, 'w', encoding='utf-8') as f:
+        f.write(str(len(text.split())))
+    return True
+
+
+def _check_task_publish(staged: list, published: list, build_id_path: str) -> bool:
+    import uuid
+    for src, dst in zip(staged, published):
+        with open(src, encoding='utf-8') as f_src, open(dst, 'w', encoding='utf-8') as f_dst:
+            f_dst.write(f_src.read())
+    with open(build_id_path, 'w', encoding='utf-8') as f:
+        f.write(uuid.uuid4().hex)
+    return True
+
+
+def self_check(workers: int = 2):
+    """
+    Construye un DAG de prueba (raw -> normalize -> vectorize x2 -> publish, para dos corpus)
+    en un directorio temporal con su propio archivo de estado y verifica que:
+    una ejecución sin cambios omite todo, cambiar una entrada solo vuelve a ejecutar lo que
+    depende de ella, y una etapa vectorize que falla deja publish 'blocked' sin tocar lo publicado.
+    """
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        def path(name):
+            return os.path.join(tmp_dir, name)
+
+        code_file = path('tarea.py')
+        with open(code_file, 'w', encoding='utf-8') as f:
+            f.write('# versión 1\n')
+
+        stages = {}
+        for corpus_name in ('a', 'b'):
+            with open(path(f'raw_{corpus_name}.txt'), 'w', encoding='utf-8') as f:
+                f.write(f'Texto Del Corpus {corpus_name}')
+            stages[f'normalize_{corpus_name}'] = Stage(
+                f'normalize_{corpus_name}', _check_task_normalize,
+                [path(f'raw_{corpus_name}.txt'), path(f'norm_{corpus_name}.txt')],
+                inputs=[path(f'raw_{corpus_name}.txt')], outputs=[path(f'norm_{corpus_name}.txt')], code=[code_file])
+            staged, published = [], []
+            for part in ('1', '2'):
+                name = f'vectorize_{corpus_name}_{part}'
+                staged.append(path(f'staged_{corpus_name}_{part}.txt'))
+                published.append(path(f'published_{corpus_name}_{part}.txt'))
+                stages[name] = Stage(
+                    name, _check_task_vectorize, [path(f'norm_{corpus_name}.txt'), staged[-1]],
+                    inputs=[path(f'norm_{corpus_name}.txt')], outputs=[staged[-1]], code=[code_file],
+                    deps=[f'normalize_{corpus_name}'])
+            stages[f'publish_{corpus_name}'] = Stage(
+                f'publish_{corpus_name}', _check_task_publish, [staged, published, path(f'build_id_{corpus_name}.txt')],
+                inputs=staged, outputs=published + [path(f'build_id_{corpus_name}.txt')], code=[code_file],
+                deps=[f'vectorize_{corpus_name}_1', f'vectorize_{corpus_name}_2'])
+
+        state_path = path('estado.json')
+
+        def run():
+            return {name: stage_status for name, stage_status, _ in
+                    run_pipeline(stages, workers=workers, state_path=state_path)}
+
+        def published_snapshot(corpus_name):
+            snapshot = {}
+            for name in (f'published_{corpus_name}_1.txt', f'published_{corpus_name}_2.txt', f'build_id_{corpus_name}.txt'):
+                with open(path(name), encoding='utf-8') as f:
+                    snapshot[name] = f.read()
+            return snapshot
+
+        assert set(run().values()) == {'ran'}
+        assert set(run().values()) == {'skipped'}
+        print("Sin cambios: se omiten las 8 etapas.")
+
+        with open(path('raw_a.txt'), 'w', encoding='utf-8') as f:
+            f.write('Texto Nuevo Del Corpus A')
+        status = run()
+        assert {name for name, stage_status in status.items() if stage_status == 'ran'} == {
+            'normalize_a', 'vectorize_a_1', 'vectorize_a_2', 'publish_a'}
+        assert {name for name, stage_status in status.items() if stage_status == 'skipped'} == {
+            'normalize_b', 'vectorize_b_1', 'vectorize_b_2', 'publish_b'}
+        print("Cambio en raw_a: solo se vuelve a ejecutar la cadena del corpus 'a'.")
+
+        before = published_snapshot('b')
+        with open(path('raw_b.txt'), 'w', encoding='utf-8') as f:
+            f.write('esta versión falla')
+        status = run()
+        assert status['normalize_b'] == 'ran'
+        assert status['vectorize_b_1'] == status['vectorize_b_2'] == 'failed'
+        assert status['publish_b'] == 'blocked'
+        assert all(status[name] == 'skipped' for name in status if name.endswith('_a') or '_a_' in name)
+        assert published_snapshot('b') == before
+        print("vectorize falla: publish queda 'blocked' y los archivos publicados y el build id no cambian.")
+
+        # El fallo no se guarda como éxito: al corregir la entrada se vuelve a intentar.
+        with open(path('raw_b.txt'), 'w', encoding='utf-8') as f:
+            f.write('esta versión funciona')
+        status = run()
+        assert status['publish_b'] == 'ran' and published_snapshot('b') != before
+        print("Entrada corregida: la cadena del corpus 'b' se vuelve a ejecutar y se publica.")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Construcción incremental de los corpus y sus representaciones.")
+    parser.add_argument('--corpus', nargs='+', choices=CORPORA, default=list(CORPORA),
+                        help="Corpus a construir (por defecto ambos).")
+    parser.add_argument('--mode', nargs='+', choices=REPRESENTATION_MODES, default=['vocabulary'],
+                        help="Modos de representación a construir (uno o varios).")
+    parser.add_argument('--n-features', type=int, default=DEFAULT_HASH_FEATURES,
+                        help="Columnas del espacio hasheado (modo 'hashing').")
+    parser.add_argument('--no-alternate-sign', action='store_true',
+                        help="Hashing sin signo alterno (modo 'hashing').")
+    parser.add_argument('--scrape', action='store_true',
+                        help="Incluir la recolección (por defecto el CSV crudo se toma como entrada fija).")
+    parser.add_argument('--force', action='store_true', help="Ejecutar todas las etapas aunque estén al día.")
+    parser.add_argument('--workers', type=int, default=None, help="Número de procesos del pool.")
+    parser.add_argument('--self-check', action='store_true',
+                        help="Verificar el orquestador con un DAG de prueba en un directorio temporal.")
+    args = parser.parse_args(argv)
+
+    if args.self_check:
+        self_check()
+        return 0
+
+    start = time.perf_counter()
+    stages = build_stages(args.corpus, args.mode, args.scrape, args.n_features, not args.no_alternate_sign)
+    report = run_pipeline(stages, workers=args.workers, force=args.force)
+    print_report(report, time.perf_counter() - start)
+
+    return 1 if any(stage_status in ('failed', 'blocked') for _, stage_status, _ in report) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,251 @@
+# query_cache.py
+
+import atexit
+import hashlib
+import os
+import pickle
+import tempfile
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+# publish_representations escribe '<id>-publishing' antes de reemplazar los archivos de un
+# corpus y modo, y '<id>' cuando terminó: mientras tanto el índice publicado puede mezclar
+# archivos de dos construcciones.
+PUBLISHING_SUFFIX = '-publishing'
+
+
+def _default_file_mode() -> int:
+    # mkstemp crea los temporales con 0600; los archivos publicados deben quedar como
+    # cualquier otro archivo creado por el proceso (0666 menos la umask).
+    umask = os.umask(0)
+    os.umask(umask)
+    return 0o666 & ~umask
+
+
+def read_build_id(build_id_path) -> str:
+    """
+    Devuelve el identificador de la última construcción publicada (ver representation.paths.build_id_file).
+    Si el índice es anterior a los build ids, usa la fecha de modificación de su directorio.
+    """
+    build_id_path = Path(build_id_path)
+    try:
+        return build_id_path.read_text(encoding='utf-8').strip()
+    except FileNotFoundError:
+        try:
+            return f"mtime-{os.stat(build_id_path.parent).st_mtime_ns}"
+        except FileNotFoundError:
+            return ''
+
+
+def is_publishing(build_id: str) -> bool:
+    """Indica si el build id corresponde a una publicación en curso (o interrumpida)."""
+    return build_id.endswith(PUBLISHING_SUFFIX)
+
+
+def make_query_key(normalized_query: str, corpus: str, feature_type: str,
+                   vector_type: str, k: int, build_id: str, mode: str = 'vocabulary') -> str:
+    """Construye la llave del caché a partir de la consulta normalizada y la configuración."""
+    raw_key = '\x1f'.join([normalized_query, corpus, feature_type, vector_type, str(k), build_id, mode])
+    return hashlib.sha1(raw_key.encode('utf-8')).hexdigest()
+
+
+class QueryCache:
+    """
+    Caché LRU en memoria para los resultados de find_similar_documents.
+    Opcionalmente se guarda en disco (pickle) para reutilizarse entre sesiones:
+    cada 'save_every' entradas nuevas, al invalidar y al terminar el proceso (si quedó algo sin guardar).
+    """
+
+    def __init__(self, maxsize: int = 1024, persist_path: str | None = None, save_every: int = 32):
+        self.maxsize = maxsize
+        self.persist_path = Path(persist_path) if persist_path else None
+        self.save_every = save_every
+        self._entries = OrderedDict()   # llave -> ((corpus, modo), resultados)
+        self._lock = threading.Lock()
+        self._unsaved_puts = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        if self.persist_path:
+            self.load()
+            atexit.register(self._save_if_dirty)
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return list(entry[1])
+
+    def put(self, key: str, corpus: str, results: list, mode: str = 'vocabulary'):
+        with self._lock:
+            self._entries[key] = ((corpus, mode), list(results))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+            self._unsaved_puts += 1
+            if self.persist_path and self._unsaved_puts >= self.save_every:
+                self._save_locked()
+
+    def invalidate(self, corpus: str | None = None, mode: str | None = None):
+        """Elimina las entradas de un corpus y modo (todos los modos si no se indica; todo si no hay corpus)."""
+        with self._lock:
+            if corpus is None:
+                self._entries.clear()
+            else:
+                stale_keys = [key for key, (scope, _) in self._entries.items()
+                              if scope[0] == corpus and (mode is None or scope[1] == mode)]
+                for key in stale_keys:
+                    del self._entries[key]
+            if self.persist_path:
+                self._save_locked()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
+
+    def save(self):
+        if not self.persist_path:
+            return
+        with self._lock:
+            self._save_locked()
+
+    def _save_if_dirty(self):
+        with self._lock:
+            if self._unsaved_puts:
+                self._save_locked()
+
+    def _save_locked(self):
+        # Se llama con self._lock tomado. El archivo temporal tiene nombre único para
+        # que dos procesos que comparten QUERY_CACHE_PATH no se pisen antes del os.replace.
+        self.persist_path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.persist_path.parent, prefix=self.persist_path.name, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(self._entries, f)
+            try:
+                os.chmod(tmp_path, os.stat(self.persist_path).st_mode & 0o777)
+            except FileNotFoundError:
+                os.chmod(tmp_path, _default_file_mode())
+            os.replace(tmp_path, self.persist_path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        self._unsaved_puts = 0
+
+    def load(self):
+        """
+        Carga el caché persistido. Un archivo ausente, corrupto o con otro formato
+        (p. ej. de una versión anterior) se descarta y se empieza con el caché vacío:
+        QUERY_CACHE se crea al importar este módulo y no debe impedir que arranque la app.
+        """
+        try:
+            with open(self.persist_path, 'rb') as f:
+                entries = OrderedDict(pickle.load(f))
+            for scope, results in entries.values():
+                if (not isinstance(scope, tuple) or len(scope) != 2 or not isinstance(results, list)
+                        or not all(isinstance(part, str) for part in scope)):
+                    raise ValueError("entrada de caché con formato desconocido")
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            print(f"Aviso: se descarta el caché de consultas '{self.persist_path}' ({e}).")
+            return
+        with self._lock:
+            self._entries = entries
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+
+# Caché compartido por el proceso. Para persistirlo entre sesiones basta con
+# definir QUERY_CACHE_PATH (p. ej. 'representation/query_cache.pkl').
+QUERY_CACHE = QueryCache(
+    maxsize=int(os.environ.get('QUERY_CACHE_SIZE', '1024')),
+    persist_path=os.environ.get('QUERY_CACHE_PATH') or None,
+)
+
+
+# --- VERIFICACIÓN (puedes ejecutar este archivo para probar) ---
+if __name__ == '__main__':
+    import stat
+
+    # LRU: al pasar de maxsize se descarta la entrada usada hace más tiempo.
+    cache = QueryCache(maxsize=3)
+    for i in range(3):
+        cache.put(f'k{i}', 'arxiv', [(i, 1.0)])
+    assert cache.get('k0') == [(0, 1.0)]          # k0 pasa a ser la más reciente
+    cache.put('k3', 'arxiv', [(3, 1.0)])          # expulsa a k1
+    assert cache.get('k1') is None and cache.get('k0') is not None and cache.get('k3') is not None
+    returned = cache.get('k3')
+    returned.append('modificado')                 # get devuelve una copia
+    assert cache.get('k3') == [(3, 1.0)]
+    print("LRU: expulsa la entrada menos reciente y devuelve copias.")
+
+    # invalidate(corpus, modo) solo borra ese alcance; invalidate(corpus) borra todos sus modos.
+    cache = QueryCache(maxsize=10)
+    cache.put('a_voc', 'arxiv', [1], 'vocabulary')
+    cache.put('a_hash', 'arxiv', [2], 'hashing')
+    cache.put('p_voc', 'pubmed', [3], 'vocabulary')
+    cache.invalidate('arxiv', 'hashing')
+    assert cache.get('a_hash') is None and cache.get('a_voc') == [1] and cache.get('p_voc') == [3]
+    cache.invalidate('arxiv')
+    assert cache.get('a_voc') is None and cache.get('p_voc') == [3]
+    cache.invalidate()
+    assert cache.get('p_voc') is None
+    print("invalidate: respeta corpus y modo.")
+
+    # stats: aciertos, fallos y tasa de acierto.
+    cache = QueryCache(maxsize=1)
+    cache.put('x', 'arxiv', [])
+    cache.get('x'); cache.get('x'); cache.get('y')
+    cache.put('z', 'arxiv', [])
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['evictions'], stats['size']) == (2, 1, 1, 1)
+    assert abs(stats['hit_rate'] - 2 / 3) < 1e-9
+    print("stats:", stats)
+
+    # La llave cambia con el build id (y con cualquier otro componente).
+    key = make_query_key('llm challenge', 'arxiv', 'unigram', 'tfidf', 10, 'build-1')
+    assert key == make_query_key('llm challenge', 'arxiv', 'unigram', 'tfidf', 10, 'build-1')
+    assert key != make_query_key('llm challenge', 'arxiv', 'unigram', 'tfidf', 10, 'build-2')
+    assert key != make_query_key('llm challenge', 'arxiv', 'unigram', 'tfidf', 10, 'build-1', 'hashing')
+    assert key != make_query_key('llm challenge', 'arxiv', 'unigram', 'tfidf', 5, 'build-1')
+    print("make_query_key: un nuevo build id produce otra llave.")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # Ida y vuelta por disco, con permisos de archivo normales (no los 0600 de mkstemp).
+        cache_path = os.path.join(tmp_dir, 'cache.pkl')
+        cache = QueryCache(maxsize=10, persist_path=cache_path, save_every=2)
+        cache.put('a', 'arxiv', [(1, 0.5)], 'hashing')
+        assert not os.path.exists(cache_path)    # aún no llega a save_every
+        cache.put('b', 'pubmed', [(2, 0.25)])
+        assert os.path.exists(cache_path)
+        assert stat.S_IMODE(os.stat(cache_path).st_mode) == _default_file_mode()
+        reloaded = QueryCache(maxsize=10, persist_path=cache_path)
+        assert reloaded.get('a') == [(1, 0.5)] and reloaded.get('b') == [(2, 0.25)]
+        reloaded.invalidate('arxiv', 'hashing')
+        assert QueryCache(persist_path=cache_path).get('a') is None
+        assert [name for name in os.listdir(tmp_dir) if name.endswith('.tmp')] == []
+        print("save/load: el caché sobrevive entre instancias.")
+
+        # Archivos corruptos o con otro formato se descartan sin lanzar excepciones.
+        bad_contents = [b'no es un pickle', pickle.dumps([1, 2, 3]), pickle.dumps({'k': ('arxiv', [1])}), pickle.dumps({'k': ('ab', [1])}),
+                        pickle.dumps(OrderedDict(k=(('arxiv', 'vocabulary'), 'no es lista'))), b'']
+        for bad_content in bad_contents:
+            with open(cache_path, 'wb') as f:
+                f.write(bad_content)
+            assert QueryCache(persist_path=cache_path).stats()['size'] == 0
+        print("load: descarta archivos de caché corruptos o de otro formato.")
@@ -0,0 +1,71 @@
+import os
+import pickle
+import time
+import tracemalloc
+
+import numpy as np
+from sklearn.metrics.pairwise import cosine_similarity
+
+from representation.paths import representation_file_prefix
+
+
+def _load_timed(path: str):
+    """Deserializa un .pkl y devuelve (objeto, segundos, bytes asignados en el pico)."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    with open(path, 'rb') as f:
+        obj = pickle.load(f)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return obj, elapsed, peak
+
+
+def _top_k(matrix, k: int):
+    """Índices de los k vecinos más cercanos (por coseno) de cada documento, sin contarse a sí mismo."""
+    similarities = cosine_similarity(matrix)
+    np.fill_diagonal(similarities, -np.inf)
+    return np.argsort(similarities, axis=1)[:, -k:]
+
+
+def compare_representation_modes(corpus_name: str, base_path: str = 'representation', k: int = 10):
+    """
+    Compara los vectorizadores con vocabulario contra los hasheados para un corpus:
+    tamaño en disco, tiempo y memoria de carga, y coincidencia de los k vecinos más
+    cercanos (overlap@k) tomando cada documento del corpus como consulta.
+    Requiere haber construido ambos modos con build_vector_representations.
+    """
+    vector_path = os.path.join(base_path, f'{corpus_name}_vectors')
+    print(f"\n--- Comparación vocabulary vs hashing: {corpus_name.upper()} ---")
+    print(f"{'Representación':<16} | {'Modo':<10} | {'Vectorizador (KB)':>17} | {'Carga (ms)':>10} | {'Pico mem (KB)':>13} | {'Overlap@k':>9}")
+    print("=" * 92)
+
+    for vector_type in ('freq', 'binary', 'tfidf'):
+        for feature_type in ('unigram', 'bigram'):
+            neighbours = {}
+            for mode in ('vocabulary', 'hashing'):
+                prefix = os.path.join(vector_path, representation_file_prefix(corpus_name, vector_type, feature_type, mode))
+                vectorizer_file = f'{prefix}_vectorizer.pkl'
+                matrix_file = f'{prefix}_matrix.pkl'
+                if not (os.path.exists(vectorizer_file) and os.path.exists(matrix_file)):
+                    print(f"{vector_type + '_' + feature_type:<16} | {mode:<10} | no construido")
+                    continue
+
+                _, load_seconds, peak_bytes = _load_timed(vectorizer_file)
+                with open(matrix_file, 'rb') as f:
+                    matrix = pickle.load(f)
+                neighbours[mode] = _top_k(matrix, k)
+
+                overlap = ''
+                if mode == 'hashing' and 'vocabulary' in neighbours:
+                    shared = [len(set(a) & set(b)) / k for a, b in zip(neighbours['vocabulary'], neighbours['hashing'])]
+                    overlap = f"{np.mean(shared):.3f}"
+
+                print(f"{vector_type + '_' + feature_type:<16} | {mode:<10} | "
+                      f"{os.path.getsize(vectorizer_file) / 1024:>17.1f} | {load_seconds * 1000:>10.2f} | "
+                      f"{peak_bytes / 1024:>13.1f} | {overlap:>9}")
+
+
+if __name__ == '__main__':
+    for corpus in ('arxiv', 'pubmed'):
+        compare_representation_modes(corpus)
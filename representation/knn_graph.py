@@ -0,0 +1,161 @@
+# Grafo de k vecinos más cercanos (por coseno) de cada documento del corpus.
+# Permite responder en O(1) las consultas de artículos que ya están en el corpus
+# (buscándolos por DOI) sin normalizar ni vectorizar la consulta.
+
+import pickle
+import re
+from functools import lru_cache
+
+import numpy as np
+from scipy import sparse
+from sklearn.preprocessing import normalize
+
+KNN_GRAPH_K = 10
+# Filas por bloque: la memoria del producto es block_size x N (float32), nunca N x N.
+KNN_BLOCK_SIZE = 256
+
+_DOI_PREFIX_RE = re.compile(r'^(https?://(dx\.)?doi\.org/|doi:\s*)', re.IGNORECASE)
+
+
+def normalize_doi(doi) -> str:
+    """Normaliza un DOI para usarlo como llave: sin prefijo 'https://doi.org/' ni 'doi:', en minúsculas."""
+    if not isinstance(doi, str):
+        return ''
+    return _DOI_PREFIX_RE.sub('', doi.strip()).lower()
+
+
+def build_knn_graph(matrix, k: int = KNN_GRAPH_K, block_size: int = KNN_BLOCK_SIZE):
+    """
+    Calcula los k vecinos más cercanos de cada fila de 'matrix' por similitud del coseno
+    mediante productos dispersos por bloques de filas.
+    Devuelve (indices int32 N x k, similitudes float32 N x k), ordenados de mayor a menor.
+    El propio documento se incluye, igual que en una búsqueda en vivo con su texto.
+    """
+    matrix = normalize(sparse.csr_matrix(matrix, dtype=np.float32), norm='l2')
+    matrix_t = matrix.T.tocsr()
+    n_docs = matrix.shape[0]
+    k = min(k, n_docs)
+
+    indices = np.empty((n_docs, k), dtype=np.int32)
+    scores = np.empty((n_docs, k), dtype=np.float32)
+
+    for start in range(0, n_docs, block_size):
+        stop = min(start + block_size, n_docs)
+        block = (matrix[start:stop] @ matrix_t).toarray()
+
+        top = np.argpartition(-block, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(block, top, axis=1)
+        order = np.argsort(-top_scores, axis=1, kind='stable')
+
+        indices[start:stop] = np.take_along_axis(top, order, axis=1)
+        scores[start:stop] = np.take_along_axis(top_scores, order, axis=1)
+
+    return indices, scores
+
+
+def save_knn_graph(path, indices, scores):
+    np.savez(path, indices=indices, scores=scores)
+
+
+def save_doi_index(path, dois):
+    """
+    Guarda {doi normalizado: fila de la matriz} para los DOIs del corpus (en el orden de sus filas),
+    junto con el número de filas para detectar un grafo que no corresponde a este índice.
+    """
+    rows = {}
+    n_docs = 0
+    for row, doi in enumerate(dois):
+        n_docs = row + 1
+        key = normalize_doi(doi)
+        if key and key not in rows:
+            rows[key] = row
+    doi_index = {'n_docs': n_docs, 'rows': rows}
+    with open(path, 'wb') as f:
+        pickle.dump(doi_index, f)
+    return doi_index
+
+
+# Los cargadores se memorizan por (ruta, build id): tras una reconstrucción del índice
+# se vuelven a leer, y entre consultas la búsqueda es un acceso a diccionario.
+@lru_cache(maxsize=64)
+def load_knn_graph(path: str, build_id: str):
+    with np.load(path) as data:
+        return data['indices'], data['scores']
+
+
+@lru_cache(maxsize=8)
+def load_doi_index(path: str, build_id: str) -> dict:
+    with open(path, 'rb') as f:
+        return pickle.load(f)
+
+
+def lookup_neighbours(graph_path: str, doi_index_path: str, build_id: str, doi: str, k: int):
+    """
+    Devuelve [(índice, similitud), ...] de los k vecinos del documento con ese DOI,
+    o None si el DOI no está en el corpus, k excede el del grafo, o el grafo y el
+    índice DOI no se pueden cargar o no corresponden entre sí. Con None,
+    find_similar_documents calcula la similitud en vivo.
+    """
+    key = normalize_doi(doi)
+    if not key:
+        return None
+    try:
+        doi_index = load_doi_index(doi_index_path, build_id)
+        row = doi_index['rows'].get(key)
+        if row is None:
+            return None
+        indices, scores = load_knn_graph(graph_path, build_id)
+    except Exception:
+        # Archivo ausente, truncado o con otro formato: no hay respuesta precalculada.
+        return None
+
+    if (indices.ndim != 2 or indices.shape != scores.shape
+            or indices.shape[0] != doi_index['n_docs'] or not 0 <= row < indices.shape[0]):
+        return None
+    if k > indices.shape[1]:
+        return None
+    return [(int(idx), float(score)) for idx, score in zip(indices[row, :k], scores[row, :k])]
+
+
+# --- VERIFICACIÓN (puedes ejecutar este archivo para probar) ---
+if __name__ == '__main__':
+    import os
+    import tempfile
+    from sklearn.metrics.pairwise import cosine_similarity
+
+    # Matriz dispersa pequeña con bloques más chicos que N, filas vacías y filas repetidas (empates).
+    test_matrix = sparse.random(57, 40, density=0.15, format='lil', random_state=1, dtype=np.float64)
+    test_matrix[3] = 0
+    test_matrix[10] = test_matrix[11]
+    test_matrix = test_matrix.tocsr()
+    test_matrix.data = np.ceil(test_matrix.data * 5)
+
+    k = 7
+    knn_indices, knn_scores = build_knn_graph(test_matrix, k=k, block_size=8)
+
+    # Fuerza bruta: matriz densa N x N completa y argsort por fila.
+    expected_scores = cosine_similarity(test_matrix)
+    expected_indices = np.argsort(-expected_scores, axis=1, kind='stable')[:, :k]
+    assert knn_indices.shape == knn_scores.shape == (57, k)
+    # Los puntajes deben coincidir exactamente en orden; los índices, salvo empates.
+    np.testing.assert_allclose(knn_scores, np.take_along_axis(expected_scores, expected_indices, axis=1), atol=1e-5)
+    np.testing.assert_allclose(np.take_along_axis(expected_scores, knn_indices.astype(np.int64), axis=1),
+                               knn_scores, atol=1e-5)
+    assert all(np.all(np.diff(row) <= 1e-6) for row in knn_scores)
+    print("build_knn_graph coincide con cosine_similarity + argsort (block_size=8 < N=57).")
+
+    # lookup_neighbours: DOI conocido, desconocido e índice que no corresponde al grafo.
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        graph_path = os.path.join(tmp_dir, 'test_knn.npz')
+        save_knn_graph(graph_path, knn_indices, knn_scores)
+        dois = [f'10.1000/test.{i}' for i in range(57)]
+        save_doi_index(os.path.join(tmp_dir, 'doi.pkl'), dois)
+        save_doi_index(os.path.join(tmp_dir, 'doi_grande.pkl'), dois + ['10.1000/test.nuevo'])
+
+        result = lookup_neighbours(graph_path, os.path.join(tmp_dir, 'doi.pkl'), 'b1', 'https://doi.org/10.1000/TEST.5', 3)
+        assert [idx for idx, _ in result] == knn_indices[5, :3].tolist()
+        assert lookup_neighbours(graph_path, os.path.join(tmp_dir, 'doi.pkl'), 'b1', '10.1000/otro', 3) is None
+        assert lookup_neighbours(graph_path, os.path.join(tmp_dir, 'doi.pkl'), 'b1', '10.1000/test.5', k + 1) is None
+        assert lookup_neighbours(graph_path, os.path.join(tmp_dir, 'doi_grande.pkl'), 'b1', '10.1000/test.nuevo', 3) is None
+        assert lookup_neighbours(os.path.join(tmp_dir, 'no_existe.npz'), os.path.join(tmp_dir, 'doi.pkl'), 'b1', '10.1000/test.5', 3) is None
+    print("lookup_neighbours responde por DOI y devuelve None ante DOIs desconocidos o índices que no corresponden.")
@@ -0,0 +1,50 @@
+# Nombres y rutas de las representaciones. Este módulo no importa sklearn ni pandas
+# para que el orquestador (pipeline.py) pueda revisar los archivos sin cargarlos.
+
+import os
+
+# Modos de representación soportados:
+#   'vocabulary' -> CountVectorizer/TfidfVectorizer con diccionario 'vocabulary_'.
+#   'hashing'    -> HashingVectorizer (sin diccionario, transformación sin estado).
+REPRESENTATION_MODES = ('vocabulary', 'hashing')
+VECTOR_TYPES = ('freq', 'binary', 'tfidf')
+FEATURE_TYPES = ('unigram', 'bigram')
+DEFAULT_HASH_FEATURES = 2 ** 20
+
+# Subdirectorio donde se construyen las representaciones antes de publicarlas.
+STAGING_DIRNAME = 'staging'
+
+
+def _mode_suffix(mode: str) -> str:
+    if mode not in REPRESENTATION_MODES:
+        raise ValueError(f"Modo de representación desconocido: '{mode}'. Opciones: {REPRESENTATION_MODES}")
+    return '' if mode == 'vocabulary' else f'_{mode}'
+
+
+def representation_file_prefix(corpus_name: str, vector_type: str, feature_type: str, mode: str = 'vocabulary') -> str:
+    """Nombre base de los .pkl de una representación (sin '_matrix.pkl' / '_vectorizer.pkl')."""
+    return f'{corpus_name}_{vector_type}_{feature_type}{_mode_suffix(mode)}'
+
+
+def representation_output_dir(corpus_name: str, base_path: str = 'representation', staging: bool = False) -> str:
+    output_dir = os.path.join(base_path, f'{corpus_name}_vectors')
+    return os.path.join(output_dir, STAGING_DIRNAME) if staging else output_dir
+
+
+def representation_files(corpus_name: str, vector_type: str, feature_type: str, mode: str = 'vocabulary',
+                         base_path: str = 'representation', staging: bool = False) -> tuple:
+    """Devuelve (ruta_vectorizador, ruta_matriz, ruta_grafo_knn) de una representación."""
+    prefix = os.path.join(representation_output_dir(corpus_name, base_path, staging),
+                          representation_file_prefix(corpus_name, vector_type, feature_type, mode))
+    return f'{prefix}_vectorizer.pkl', f'{prefix}_matrix.pkl', f'{prefix}_knn.npz'
+
+
+def doi_index_file(corpus_name: str, mode: str = 'vocabulary', base_path: str = 'representation') -> str:
+    """Ruta del índice DOI -> fila del corpus de las representaciones publicadas de un modo."""
+    return os.path.join(representation_output_dir(corpus_name, base_path),
+                        f'{corpus_name}_doi_index{_mode_suffix(mode)}.pkl')
+
+
+def build_id_file(corpus_name: str, mode: str = 'vocabulary', base_path: str = 'representation') -> str:
+    """Ruta del identificador de construcción de un corpus y modo (ver query_cache.read_build_id)."""
+    return os.path.join(representation_output_dir(corpus_name, base_path), f'build_id{_mode_suffix(mode)}.txt')
@@ -1,64 +1,219 @@
 import pandas as pd
-from sklearn.feature_extraction.text import CountVectorizer, TfidfVectorizer
+from sklearn.feature_extraction.text import CountVectorizer, TfidfVectorizer, HashingVectorizer, TfidfTransformer
+from sklearn.pipeline import make_pipeline
 import pickle
 import os
+import shutil
+import tempfile
+import uuid
 
-def build_vector_representations(corpus_name: str):
-    """
-    Genera y guarda las 6 representaciones vectoriales para un corpus específico.
+from query_cache import PUBLISHING_SUFFIX, QUERY_CACHE
+from representation.paths import (DEFAULT_HASH_FEATURES, FEATURE_TYPES, REPRESENTATION_MODES, VECTOR_TYPES,
+                                  build_id_file, doi_index_file, representation_file_prefix,
+                                  representation_files, representation_output_dir)
+from representation.knn_graph import build_knn_graph, save_doi_index, save_knn_graph
 
-    Args:
-        corpus_name (str): El nombre del corpus a procesar (ej. 'arxiv' o 'pubmed').
+
+def _hashing_vectorizer(ngram_range, binary=False, n_features=DEFAULT_HASH_FEATURES, alternate_sign=True):
+    # norm=None para conservar conteos crudos, igual que CountVectorizer.
+    return HashingVectorizer(ngram_range=ngram_range, binary=binary, norm=None,
+                             n_features=n_features, alternate_sign=alternate_sign)
+
+
+def build_vectorizer_configs(corpus_name: str, mode: str = 'vocabulary',
+                             n_features: int = DEFAULT_HASH_FEATURES, alternate_sign: bool = True) -> dict:
     """
-    # Construcción dinámica de rutas basada en la estructura del proyecto
-    input_csv_path = f'normalizated_corpus/{corpus_name}_normalized_corpus.csv'
-    output_dir = f'representation/{corpus_name}_vectors'
+    Devuelve {nombre_base: vectorizador} con las 6 configuraciones para el modo indicado.
+    En modo 'hashing' la variante tfidf es HashingVectorizer + TfidfTransformer, que solo
+    guarda el arreglo 'idf_'. 'alternate_sign' aplica a freq y tfidf; binary siempre es sin signo.
+    """
+    names = {
+        (vector_type, feature_type): representation_file_prefix(corpus_name, vector_type, feature_type, mode)
+        for vector_type in VECTOR_TYPES
+        for feature_type in FEATURE_TYPES
+    }
+
+    if mode == 'vocabulary':
+        return {
+            names['freq', 'unigram']: CountVectorizer(ngram_range=(1, 1)),
+            names['freq', 'bigram']:  CountVectorizer(ngram_range=(2, 2)),
+            names['binary', 'unigram']: CountVectorizer(ngram_range=(1, 1), binary=True),
+            names['binary', 'bigram']:  CountVectorizer(ngram_range=(2, 2), binary=True),
+            names['tfidf', 'unigram']: TfidfVectorizer(ngram_range=(1, 1)),
+            names['tfidf', 'bigram']:  TfidfVectorizer(ngram_range=(2, 2))
+        }
+
+    hashing_options = {'n_features': n_features, 'alternate_sign': alternate_sign}
+    # Con binary=True, HashingVectorizer pone X.data en 1 después de hashear, así que el
+    # signo alterno se perdería igual: las variantes binarias usan hashing sin signo.
+    binary_options = {'n_features': n_features, 'alternate_sign': False}
+    return {
+        names['freq', 'unigram']: _hashing_vectorizer((1, 1), **hashing_options),
+        names['freq', 'bigram']:  _hashing_vectorizer((2, 2), **hashing_options),
+        names['binary', 'unigram']: _hashing_vectorizer((1, 1), binary=True, **binary_options),
+        names['binary', 'bigram']:  _hashing_vectorizer((2, 2), binary=True, **binary_options),
+        names['tfidf', 'unigram']: make_pipeline(_hashing_vectorizer((1, 1), **hashing_options), TfidfTransformer()),
+        names['tfidf', 'bigram']:  make_pipeline(_hashing_vectorizer((2, 2), **hashing_options), TfidfTransformer())
+    }
 
-    print(f"\n--- Iniciando la representación para el corpus: {corpus_name.upper()} ---")
 
-    # 1. Cargar el corpus normalizado
+def load_corpus_texts(corpus_name: str):
+    """Carga el corpus normalizado y devuelve Título + Abstract por documento (o None si no existe)."""
+    input_csv_path = f'normalizated_corpus/{corpus_name}_normalized_corpus.csv'
     try:
         df = pd.read_csv(input_csv_path)
         print(f"Corpus '{input_csv_path}' cargado.")
     except FileNotFoundError:
         print(f"Error: No se encontró el archivo '{input_csv_path}'. Saltando este corpus.")
+        return None
+
+    # Combinar Título y Abstract
+    return df['Title'].fillna('') + ' ' + df['Abstract'].fillna('')
+
+
+def _fit_and_save(name: str, vectorizer, corpus_texts, output_dir: str):
+    print(f"Generando representación: {name}...")
+
+    vector_matrix = vectorizer.fit_transform(corpus_texts)
+
+    vectorizer_path = os.path.join(output_dir, f'{name}_vectorizer.pkl')
+    matrix_path = os.path.join(output_dir, f'{name}_matrix.pkl')
+
+    # Guardar el vectorizador y la matriz
+    with open(vectorizer_path, 'wb') as f:
+        pickle.dump(vectorizer, f)
+
+    with open(matrix_path, 'wb') as f:
+        pickle.dump(vector_matrix, f)
+
+    # Grafo de vecinos de cada documento del corpus (consultas por DOI)
+    knn_indices, knn_scores = build_knn_graph(vector_matrix)
+    save_knn_graph(os.path.join(output_dir, f'{name}_knn.npz'), knn_indices, knn_scores)
+
+    print(f" -> Guardado en '{output_dir}'")
+
+
+def _replace_with_copy(src: str, dst: str):
+    # Copia a un temporal en el directorio destino y lo renombra: quien lea 'dst'
+    # ve el archivo viejo o el nuevo completo, nunca uno a medio escribir.
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(dst), prefix=os.path.basename(dst), suffix='.tmp')
+    os.close(fd)
+    try:
+        shutil.copyfile(src, tmp_path)
+        # mkstemp crea el temporal con 0600: se conservan los permisos del archivo publicado
+        # (o 0666 menos la umask si es nuevo) para que otros usuarios puedan leer el índice.
+        if os.path.exists(dst):
+            shutil.copymode(dst, tmp_path)
+        else:
+            umask = os.umask(0)
+            os.umask(umask)
+            os.chmod(tmp_path, 0o666 & ~umask)
+        os.replace(tmp_path, dst)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def publish_representations(corpus_name: str, mode: str = 'vocabulary'):
+    """
+    Publica las 6 representaciones de 'staging' de un corpus y modo junto con el índice DOI -> fila.
+    Cada archivo se reemplaza de forma atómica, pero el conjunto no: el build id se cambia
+    a '<id>-publishing' antes de reemplazarlos y a '<id>' al terminar, y find_similar_documents
+    descarta (sin guardarla en el caché) una búsqueda si el build id cambió mientras leía.
+    El nuevo build id invalida el caché de consultas (también el persistido) y los grafos ya cargados.
+    Si alguna representación no terminó, no se publica nada y el índice anterior sigue vigente;
+    si la publicación se interrumpe, las búsquedas de ese modo fallan hasta volver a publicar.
+    """
+    staged_files = [
+        (staged, published)
+        for vector_type in VECTOR_TYPES
+        for feature_type in FEATURE_TYPES
+        for staged, published in zip(representation_files(corpus_name, vector_type, feature_type, mode, staging=True),
+                                     representation_files(corpus_name, vector_type, feature_type, mode))
+    ]
+    missing = [staged for staged, _ in staged_files if not os.path.exists(staged)]
+    if missing:
+        print(f"Error: faltan representaciones en staging para {corpus_name} ({mode}): {missing}")
+        return False
+
+    staging_dir = representation_output_dir(corpus_name, staging=True)
+    dois = pd.read_csv(f'normalizated_corpus/{corpus_name}_normalized_corpus.csv', usecols=['DOI'])['DOI']
+    staged_doi_index = os.path.join(staging_dir, os.path.basename(doi_index_file(corpus_name, mode)))
+    save_doi_index(staged_doi_index, dois)
+    staged_files.append((staged_doi_index, doi_index_file(corpus_name, mode)))
+
+    build_id = uuid.uuid4().hex
+    _write_build_id(corpus_name, mode, build_id + PUBLISHING_SUFFIX)
+    for staged, published in staged_files:
+        _replace_with_copy(staged, published)
+    _write_build_id(corpus_name, mode, build_id)
+    QUERY_CACHE.invalidate(corpus_name, mode)
+    return True
+
+
+def _write_build_id(corpus_name: str, mode: str, build_id: str):
+    staged_build_id = os.path.join(representation_output_dir(corpus_name, staging=True),
+                                   os.path.basename(build_id_file(corpus_name, mode)))
+    with open(staged_build_id, 'w', encoding='utf-8') as f:
+        f.write(build_id)
+    _replace_with_copy(staged_build_id, build_id_file(corpus_name, mode))
+
+
+def build_single_representation(corpus_name: str, vector_type: str, feature_type: str, mode: str = 'vocabulary',
+                                n_features: int = DEFAULT_HASH_FEATURES, alternate_sign: bool = True) -> bool:
+    """
+    Genera una sola de las 6 representaciones en 'staging' (usada por pipeline.py para
+    construirlas en paralelo). No toca los archivos publicados; eso lo hace publish_representations.
+    """
+    corpus_texts = load_corpus_texts(corpus_name)
+    if corpus_texts is None:
+        return False
+
+    staging_dir = representation_output_dir(corpus_name, staging=True)
+    os.makedirs(staging_dir, exist_ok=True)
+
+    name = representation_file_prefix(corpus_name, vector_type, feature_type, mode)
+    vectorizer = build_vectorizer_configs(corpus_name, mode, n_features, alternate_sign)[name]
+    _fit_and_save(name, vectorizer, corpus_texts, staging_dir)
+    return True
+
+
+def build_vector_representations(corpus_name: str, mode: str = 'vocabulary',
+                                 n_features: int = DEFAULT_HASH_FEATURES, alternate_sign: bool = True):
+    """
+    Genera y guarda las 6 representaciones vectoriales para un corpus específico.
+
+    Args:
+        corpus_name (str): El nombre del corpus a procesar (ej. 'arxiv' o 'pubmed').
+        mode (str): 'vocabulary' (por defecto) o 'hashing'.
+        n_features (int): Número de columnas del espacio hasheado (solo modo 'hashing').
+        alternate_sign (bool): Hashing con signo para compensar colisiones (solo modo 'hashing';
+            no aplica a las variantes binarias).
+    """
+    # Construcción dinámica de rutas basada en la estructura del proyecto.
+    # Se construye en 'staging' y se publica al final, todo o nada.
+    output_dir = representation_output_dir(corpus_name, staging=True)
+
+    print(f"\n--- Iniciando la representación para el corpus: {corpus_name.upper()} ---")
+
+    # 1. Cargar el corpus normalizado (Título + Abstract)
+    corpus_texts = load_corpus_texts(corpus_name)
+    if corpus_texts is None:
         return
 
-    # 2. Combinar Título y Abstract
-    df['combined_text'] = df['Title'].fillna('') + ' ' + df['Abstract'].fillna('')
-    corpus_texts = df['combined_text']
-
-    # 3. Definir las configuraciones de vectorización
-    vectorizer_configs = {
-        f'{corpus_name}_freq_unigram': CountVectorizer(ngram_range=(1, 1)),
-        f'{corpus_name}_freq_bigram':  CountVectorizer(ngram_range=(2, 2)),
-        f'{corpus_name}_binary_unigram': CountVectorizer(ngram_range=(1, 1), binary=True),
-        f'{corpus_name}_binary_bigram':  CountVectorizer(ngram_range=(2, 2), binary=True),
-        f'{corpus_name}_tfidf_unigram': TfidfVectorizer(ngram_range=(1, 1)),
-        f'{corpus_name}_tfidf_bigram':  TfidfVectorizer(ngram_range=(2, 2))
-    }
+    # 2. Definir las configuraciones de vectorización
+    vectorizer_configs = build_vectorizer_configs(corpus_name, mode, n_features, alternate_sign)
 
     # Crear el directorio de salida si no existe
     if not os.path.exists(output_dir):
         os.makedirs(output_dir)
         print(f"Directorio de salida creado en: '{output_dir}'")
 
-    # 4. Iterar, generar y guardar cada representación
+    # 3. Iterar, generar y guardar cada representación
     for name, vectorizer in vectorizer_configs.items():
-        print(f"Generando representación: {name}...")
-        
-        vector_matrix = vectorizer.fit_transform(corpus_texts)
-        
-        vectorizer_path = os.path.join(output_dir, f'{name}_vectorizer.pkl')
-        matrix_path = os.path.join(output_dir, f'{name}_matrix.pkl')
-        
-        # 5. Guardar el vectorizador y la matriz
-        with open(vectorizer_path, 'wb') as f:
-            pickle.dump(vectorizer, f)
-        
-        with open(matrix_path, 'wb') as f:
-            pickle.dump(vector_matrix, f)
-            
-        print(f" -> Guardado en '{output_dir}'")
-
-    print(f"--- Representación para {corpus_name.upper()} completada. ---")
\ No newline at end of file
+        _fit_and_save(name, vectorizer, corpus_texts, output_dir)
+
+    # 4. Publicar las representaciones junto con el índice DOI y un nuevo build id
+    publish_representations(corpus_name, mode)
+
+    print(f"--- Representación para {corpus_name.upper()} completada. ---")
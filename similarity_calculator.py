@@ -1,9 +1,19 @@
 # similarity_calculator.py (versión actualizada con tu normalización de spaCy)
 
 import pickle
+import time
 import numpy as np
 from sklearn.metrics.pairwise import cosine_similarity
 from pathlib import Path
+from functools import lru_cache
+
+from query_cache import QUERY_CACHE, is_publishing, make_query_key, read_build_id
+from representation.paths import build_id_file, doi_index_file, representation_file_prefix
+from representation.knn_graph import lookup_neighbours
+
+# Reintentos cuando una búsqueda coincide con publish_representations (ver find_similar_documents).
+PUBLISH_RETRIES = 5
+PUBLISH_RETRY_DELAY = 0.2
 
 # --- NUEVO: INICIO DE CONFIGURACIÓN DE SPACY ---
 # Importamos las librerías necesarias para tu normalización
@@ -19,6 +29,7 @@ nlp = spacy.load("en_core_web_sm")
 infix_re = re.compile(r'''[.\,\?\!\:\;\...\‘\’\`\“\”\"\'~]''')
 nlp.tokenizer.infix_finditer = infix_re.finditer
 
+@lru_cache(maxsize=1024)
 def normalize_text(text: str) -> str:
     """
     Normaliza un texto utilizando el pipeline de spaCy.
@@ -48,40 +59,88 @@ def normalize_text(text: str) -> str:
 # --- FIN DE CONFIGURACIÓN DE SPACY ---
 
 
-def find_similar_documents(query_text: str, corpus: str, feature_type: str, vector_type: str, base_path: str = 'representation'):
+def _compute_similarities(normalized_query: str, matrix_file: Path, vectorizer_file: Path, k: int):
+    """Carga la matriz y el vectorizador publicados y devuelve los k documentos más similares."""
+    # Cargar la matriz del corpus y el vectorizador
+    with open(matrix_file, 'rb') as f:
+        corpus_matrix = pickle.load(f)
+
+    with open(vectorizer_file, 'rb') as f:
+        vectorizer = pickle.load(f)
+
+    # Transformar el texto YA NORMALIZADO usando el vectorizador cargado
+    query_vector = vectorizer.transform([normalized_query])
+
+    # Aplicar el algoritmo de similitud del coseno
+    cosine_similarities = cosine_similarity(query_vector, corpus_matrix).flatten()
+
+    # Obtener los índices de los k documentos más similares
+    most_similar_indices = np.argsort(cosine_similarities)[-k:][::-1]
+
+    # Crear la lista de resultados con (índice, similitud)
+    return [(idx, cosine_similarities[idx]) for idx in most_similar_indices]
+
+
+def find_similar_documents(query_text: str, corpus: str, feature_type: str, vector_type: str, base_path: str = 'representation', k: int = 10, use_cache: bool = True, mode: str = 'vocabulary', doi: str | None = None):
     """
-    Encuentra los 10 documentos más similares a un texto de consulta dado.
+    Encuentra los k documentos más similares a un texto de consulta dado.
+    Los resultados se guardan en QUERY_CACHE; una consulta repetida no vuelve a
+    vectorizarse ni a calcular similitudes mientras el índice no se reconstruya.
+    'mode' elige entre los vectorizadores con vocabulario ('vocabulary') o hasheados ('hashing').
+    Si se da el 'doi' de un artículo que ya está en el corpus, la respuesta sale del
+    grafo de vecinos precalculado; si no está, se calcula en vivo con 'query_text'.
     """
+    vector_path = Path(base_path) / f"{corpus}_vectors"
     try:
         # 1. Construir las rutas a los archivos .pkl
-        vector_path = Path(base_path) / f"{corpus}_vectors"
-        matrix_file = vector_path / f"{corpus}_{vector_type}_{feature_type}_matrix.pkl"
-        vectorizer_file = vector_path / f"{corpus}_{vector_type}_{feature_type}_vectorizer.pkl"
+        file_prefix = representation_file_prefix(corpus, vector_type, feature_type, mode)
+        matrix_file = vector_path / f"{file_prefix}_matrix.pkl"
+        vectorizer_file = vector_path / f"{file_prefix}_vectorizer.pkl"
+        build_id_path = build_id_file(corpus, mode, base_path)
 
-        # 2. Cargar la matriz del corpus y el vectorizador
-        with open(matrix_file, 'rb') as f:
-            corpus_matrix = pickle.load(f)
-        
-        with open(vectorizer_file, 'rb') as f:
-            vectorizer = pickle.load(f)
+        # publish_representations reemplaza los archivos uno por uno entre dos escrituras
+        # del build id. Si el build id indica una publicación en curso o cambia mientras se
+        # leen los archivos, lo leído puede mezclar dos construcciones: se descarta (sin
+        # guardarlo en el caché) y se vuelve a intentar.
+        for attempt in range(PUBLISH_RETRIES):
+            if attempt:
+                time.sleep(PUBLISH_RETRY_DELAY)
+            build_id = read_build_id(build_id_path)
+            if is_publishing(build_id):
+                continue
 
-        # 3. <<-- PASO CLAVE: Normalizamos el texto de la consulta -->>
-     
-        normalized_query = normalize_text(query_text)
-        
-        # 4. Transformar el texto YA NORMALIZADO usando el vectorizador cargado
-        query_vector = vectorizer.transform([normalized_query])
+            # 2. Artículo conocido: búsqueda O(1) en el grafo de vecinos por DOI
+            results = None
+            if doi:
+                results = lookup_neighbours(str(vector_path / f"{file_prefix}_knn.npz"),
+                                            doi_index_file(corpus, mode, base_path), build_id, doi, k)
 
-        # 5. Aplicar el algoritmo de similitud del coseno
-        cosine_similarities = cosine_similarity(query_vector, corpus_matrix).flatten()
+            cache_key = None
+            if results is None:
+                # 3. <<-- PASO CLAVE: Normalizamos el texto de la consulta -->>
+                #    (normalize_text está memorizado, así que una consulta repetida no pasa por spaCy)
+                normalized_query = normalize_text(query_text)
 
-        # 6. Obtener los índices de los 10 documentos más similares
-        most_similar_indices = np.argsort(cosine_similarities)[-10:][::-1]
+                # 4. Revisar el caché de resultados antes de cargar nada del disco
+                if use_cache:
+                    cache_key = make_query_key(normalized_query, corpus, feature_type, vector_type, k, build_id, mode)
+                    cached_results = QUERY_CACHE.get(cache_key)
+                    if cached_results is not None:
+                        return cached_results
 
-        # 7. Crear la lista de resultados con (índice, similitud)
-        results = [(idx, cosine_similarities[idx]) for idx in most_similar_indices]
-        
-        return results
+                # 5. Cargar el índice publicado y calcular la similitud del coseno
+                results = _compute_similarities(normalized_query, matrix_file, vectorizer_file, k)
+
+            # 6. Solo se acepta (y se guarda en el caché) si el índice no cambió mientras se leía
+            if read_build_id(build_id_path) != build_id:
+                continue
+            if cache_key is not None:
+                QUERY_CACHE.put(cache_key, corpus, results, mode)
+            return results
+
+        print(f"Error: las representaciones de {corpus} ({mode}) se están publicando o la publicación "
+              f"quedó incompleta. Intenta de nuevo o vuelve a ejecutar 'python pipeline.py'.")
+        return []
 
     except FileNotFoundError:
         print(f"Error: No se encontraron los archivos para la configuración:")
@@ -90,4 +149,9 @@ def find_similar_documents(query_text: str, corpus: str, feature_type: str, vect
         return []
     except Exception as e:
         print(f"Ocurrió un error inesperado: {e}")
-        return []
\ No newline at end of file
+        return []
+
+
+def get_cache_stats() -> dict:
+    """Devuelve las estadísticas (aciertos, fallos, tasa de acierto) del caché de consultas."""
+    return QUERY_CACHE.stats()